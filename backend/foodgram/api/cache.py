@@ -0,0 +1,97 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = 'version:{}'
+FRAGMENT_KEY = 'fragment:{}:{}'
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_versions(names):
+    """
+    Возвращает версии наборов данных - время их последнего
+    изменения в микросекундах - одним обращением к кэшу.
+    Если кэш ничего не сохраняет (недоступен Redis, DummyCache),
+    версией считается текущее время: кэш фактически отключается.
+    """
+    keys = {VERSION_KEY.format(name): name for name in names}
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        now = time.time_ns() // 1000
+        for key in missing:
+            cache.add(key, now, timeout=None)
+        versions.update(cache.get_many(missing))
+        for key in missing:
+            versions.setdefault(key, now)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def get_version(name):
+    """Версия одного набора данных."""
+    return get_versions([name])[name]
+
+
+def invalidate_tags(*names):
+    """Сбрасывает кэш наборов данных, выставляя им новые версии."""
+    now = time.time_ns() // 1000
+    cache.set_many(
+        {VERSION_KEY.format(name): now for name in names}, timeout=None)
+
+
+def invalidate_tags_on_commit(*names):
+    """
+    Сбрасывает теги после фиксации текущей транзакции: иначе
+    параллельный запрос может закэшировать ещё старые данные
+    уже с новой версией.
+    """
+    transaction.on_commit(lambda: invalidate_tags(*names))
+
+
+def bump_version(name):
+    """Сбрасывает кэш набора данных."""
+    invalidate_tags(name)
+
+
+def get_fragments(name, ids):
+    """
+    Возвращает {id: данные} для закэшированных фрагментов, все теги
+    которых не менялись с момента их сохранения.
+    """
+    keys = {FRAGMENT_KEY.format(name, pk): pk for pk in ids}
+    cached = cache.get_many(keys)
+    tags = {tag for item in cached.values() for tag in item['tags']}
+    versions = get_versions(tags) if tags else {}
+    return {
+        keys[key]: item['data'] for key, item in cached.items()
+        if all(versions.get(tag) == version
+               for tag, version in item['tags'].items())
+    }
+
+
+def set_fragments(name, fragments, versions, timeout=None):
+    """
+    Сохраняет фрагменты {id: (данные, теги)}. Версии тегов нужно
+    получить до построения данных, иначе изменение, случившееся
+    в это время, не сбросит фрагмент.
+    """
+    if timeout is None:
+        timeout = settings.FRAGMENT_CACHE_TIMEOUT
+    cache.set_many({
+        FRAGMENT_KEY.format(name, pk): {
+            'data': data,
+            'tags': {tag: versions[tag] for tag in tags},
+        }
+        for pk, (data, tags) in fragments.items()
+    }, timeout=timeout)
+
+
+def make_etag(*parts):
+    """Строгий ETag из произвольных частей ключа."""
+    digest = hashlib.md5(
+        ':'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+    return f'"{digest}"'
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.utils.encoding import filepath_to_uri
+from rest_framework import serializers
+
+
+def get_media_url(context):
+    """
+    Абсолютный адрес MEDIA_URL, вычисляемый один раз
+    на весь контекст сериализации.
+    """
+    if 'media_url' not in context:
+        request = context.get('request')
+        media_url = settings.MEDIA_URL
+        if request is not None:
+            media_url = request.build_absolute_uri(media_url)
+        context['media_url'] = media_url
+    return context['media_url']
+
+
+class RecipeImageField(serializers.ReadOnlyField):
+    """Абсолютная ссылка на изображение рецепта."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        return get_media_url(self.context) + filepath_to_uri(value.name)
+
+
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Ссылки на варианты изображения рецепта."""
+
+    def to_representation(self, value):
+        media_url = get_media_url(self.context)
+        return {
+            rendition: {
+                extension: media_url + filepath_to_uri(name)
+                for extension, name in names.items()
+            }
+            for rendition, names in value.items()
+        }
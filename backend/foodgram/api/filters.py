@@ -1,37 +1,136 @@
 import django_filters
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import (Case, Count, Exists, F, IntegerField, OuterRef,
+                              Q, Value, When)
 from django_filters.rest_framework import filters
-from recipes.models import Ingredient, Recipe, Tag
+from recipes.models import Ingredient, Recipe, RecipeIngredient, RecipeTag
+
+from .search import ingredient_index
+from .utils import SEARCH_CONFIG, get_tag_slug_map
 
 User = get_user_model()
 
 
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    """Список чисел через запятую: ?param=1,2,3."""
+
+
 class IngredientFilter(django_filters.FilterSet):
-    """Фильтр для ингредиентов."""
-    name = django_filters.CharFilter(field_name='name',
-                                     lookup_expr='icontains')
+    """
+    Фильтр для ингредиентов: сначала совпадения по началу
+    названия, затем по вхождению.
+    """
+    name = django_filters.CharFilter(method='filter_name')
+    limit = django_filters.NumberFilter(method='filter_limit', min_value=1)
 
     class Meta:
         model = Ingredient
-        fields = ('name',)
+        fields = ('name', 'limit')
+
+    def filter_name(self, queryset, name, value):
+        limit = self.form.cleaned_data.get('limit')
+        prefix_ids, other_ids = ingredient_index.search(
+            value, int(limit) if limit else None)
+        return queryset.filter(id__in=prefix_ids + other_ids).annotate(
+            search_rank=Case(
+                When(id__in=prefix_ids, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        ).order_by('search_rank', 'name', 'measurement_unit')
+
+    def filter_limit(self, queryset, name, value):
+        """
+        Без name ограничивает весь список, с name ограничение
+        применяется к поиску в filter_name.
+        """
+        if self.form.cleaned_data.get('name'):
+            return queryset
+        return queryset[:int(value)]
 
 
 class RecipeFilter(django_filters.FilterSet):
     """Фильтр для рецептов."""
-    tags = django_filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        field_name='tags__slug',
-        to_field_name='slug',
-        lookup_expr='contains',
-    )
+    tags = django_filters.CharFilter(method='filter_tags')
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
     is_favorited = filters.BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart')
+    search = django_filters.CharFilter(method='filter_search')
+    ingredients = NumberInFilter(method='filter_ingredients_all')
+    any_ingredients = NumberInFilter(method='filter_ingredients_any')
+    exclude_ingredients = NumberInFilter(method='filter_ingredients_exclude')
+    cooking_time = filters.RangeFilter()
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'search', 'ingredients', 'any_ingredients',
+                  'exclude_ingredients', 'cooking_time')
+
+    def filter_tags(self, queryset, name, value):
+        """
+        Рецепты, у которых есть хотя бы один из переданных тэгов.
+        Проверка через EXISTS не размножает строки рецептов.
+        """
+        slug_map = get_tag_slug_map()
+        tag_ids = [slug_map[slug] for slug in self.data.getlist(name)
+                   if slug in slug_map]
+        return queryset.annotate(
+            has_tags=Exists(RecipeTag.objects.filter(
+                recipe=OuterRef('pk'), tag_id__in=tag_ids))
+        ).filter(has_tags=True)
+
+    def filter_search(self, queryset, name, value):
+        """
+        Полнотекстовый поиск по названию, ингредиентам и описанию
+        с сортировкой по релевантности. Без PostgreSQL - поиск
+        подстроки в тех же полях; на SQLite регистр не учитывается
+        только для латиницы, кириллица ищется с учётом регистра.
+        """
+        if connection.vendor != 'postgresql':
+            return queryset.annotate(
+                has_ingredient=Exists(RecipeIngredient.objects.filter(
+                    recipe=OuterRef('pk'), ingredient__name__icontains=value))
+            ).filter(Q(name__icontains=value) | Q(text__icontains=value)
+                     | Q(has_ingredient=True))
+        query = SearchQuery(value, config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-id')
+
+    def filter_ingredients_all(self, queryset, name, value):
+        """
+        Рецепты со всеми переданными ингредиентами: подзапрос
+        GROUP BY recipe HAVING COUNT по индексу (ingredient, recipe).
+        """
+        ingredient_ids = {int(pk) for pk in value}
+        recipe_ids = RecipeIngredient.objects.filter(
+            ingredient_id__in=ingredient_ids
+        ).order_by().values('recipe').annotate(
+            matched=Count('ingredient')
+        ).filter(matched=len(ingredient_ids)).values('recipe')
+        return queryset.filter(id__in=recipe_ids)
+
+    def filter_ingredients_any(self, queryset, name, value):
+        """Рецепты хотя бы с одним из переданных ингредиентов."""
+        return queryset.annotate(
+            has_any_ingredient=self.ingredients_exist(value)
+        ).filter(has_any_ingredient=True)
+
+    def filter_ingredients_exclude(self, queryset, name, value):
+        """Рецепты без переданных ингредиентов."""
+        return queryset.annotate(
+            has_excluded_ingredient=self.ingredients_exist(value)
+        ).filter(has_excluded_ingredient=False)
+
+    @staticmethod
+    def ingredients_exist(value):
+        return Exists(RecipeIngredient.objects.filter(
+            recipe=OuterRef('pk'),
+            ingredient_id__in={int(pk) for pk in value}))
 
     def get_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import REFERENCE_CACHE_TIMEOUT, get_version, make_etag
+from .relations import UserRelations
+
+
+class CachedReadOnlyMixin:
+    """
+    Кэширует ответы list/retrieve для редко меняющихся справочников.
+    Кэш версионируется по cache_version_name, ответы содержат
+    ETag и Last-Modified, повторный запрос получает 304.
+    """
+    cache_version_name = None
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(super().list, request,
+                                        *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(super().retrieve, request,
+                                        *args, **kwargs)
+
+    def get_cached_response(self, handler, request, *args, **kwargs):
+        version = get_version(self.cache_version_name)
+        path = request.get_full_path()
+        etag = make_etag(self.cache_version_name, version, path)
+        last_modified = version // 1_000_000
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return self.set_cache_headers(not_modified, etag, last_modified)
+        key = f'{self.cache_version_name}:{version}:{path}'
+        data = cache.get(key)
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cache.set(key, response.data, timeout=REFERENCE_CACHE_TIMEOUT)
+        else:
+            response = Response(data)
+        return self.set_cache_headers(response, etag, last_modified)
+
+    def set_cache_headers(self, response, etag, last_modified):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class RelationsContextMixin:
+    """
+    Добавляет в контекст сериалайзеров сервис связей текущего
+    пользователя, общий для всех сериалайзеров запроса.
+    """
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['relations'] = UserRelations(self.request.user)
+        return context
@@ -1,7 +1,64 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
 from rest_framework import pagination
 
 
+class CachedCountPaginator(Paginator):
+    """
+    Пагинатор, кэширующий общее количество объектов
+    на PAGE_COUNT_CACHE_TIMEOUT секунд.
+    COUNT считается без аннотаций queryset: иначе подзапросы
+    признаков пользователя попадают в GROUP BY.
+    """
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        queryset = self.object_list.values('pk').order_by()
+        timeout = settings.PAGE_COUNT_CACHE_TIMEOUT
+        if not timeout:
+            return queryset.count()
+        key = 'page-count:' + hashlib.md5(
+            str(queryset.query).encode()).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, timeout)
+        return count
+
+
+class RecipeCursorPagination(pagination.CursorPagination):
+    """Пагинация курсором по убыванию id без COUNT и OFFSET."""
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = '-id'
+
+
 class RecipePagination(pagination.PageNumberPagination):
-    """Пагинация на сранице."""
+    """
+    Пагинация на сранице.
+    С параметром ?pagination=cursor переключается на пагинацию курсором.
+    """
     page_size = 6
     page_size_query_param = 'limit'
+    django_paginator_class = CachedCountPaginator
+    mode_query_param = 'pagination'
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.mode_query_param) == 'cursor':
+            self.cursor_paginator = RecipeCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
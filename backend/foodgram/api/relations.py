@@ -0,0 +1,60 @@
+from collections import defaultdict
+
+from recipes.models import FavoriteRecipe
+from shopping_cart.models import ShoppingCart
+from users.models import Follow
+
+FAVORITE = 'favorite'
+SHOPPING_CART = 'shopping_cart'
+FOLLOW = 'follow'
+
+
+class UserRelations:
+    """
+    Связи текущего пользователя с объектами в пределах запроса.
+    Сериалайзеры списков заранее регистрируют id, при первой
+    проверке все накопленные id связи проверяются одним запросом,
+    результат хранится до конца запроса.
+    """
+    relations = {
+        FAVORITE: (FavoriteRecipe, 'recipe_id'),
+        SHOPPING_CART: (ShoppingCart, 'recipe_id'),
+        FOLLOW: (Follow, 'author_id'),
+    }
+
+    def __init__(self, user):
+        self.user = user
+        self.pending = defaultdict(set)
+        self.checked = defaultdict(set)
+        self.related = defaultdict(set)
+
+    def register(self, relation, ids):
+        """Запоминает id, которые понадобится проверить."""
+        self.pending[relation].update(ids)
+
+    def has(self, relation, pk):
+        """Связан ли текущий пользователь с объектом pk."""
+        if self.user.is_anonymous:
+            return False
+        if pk not in self.checked[relation]:
+            self.pending[relation].add(pk)
+            self.resolve(relation)
+        return pk in self.related[relation]
+
+    def resolve(self, relation):
+        ids = self.pending.pop(relation) - self.checked[relation]
+        model, field = self.relations[relation]
+        self.related[relation].update(model.objects.filter(
+            user=self.user, **{f'{field}__in': ids}
+        ).values_list(field, flat=True))
+        self.checked[relation].update(ids)
+
+
+def get_relations(context):
+    """
+    Сервис связей из контекста сериализации. Для контекстов,
+    собранных без вьюсета, создаётся при первом обращении.
+    """
+    if 'relations' not in context:
+        context['relations'] = UserRelations(context['request'].user)
+    return context['relations']
@@ -0,0 +1,65 @@
+import csv
+import json
+
+from rest_framework import renderers
+
+
+class ShoppingListRenderer(renderers.BaseRenderer):
+    """Базовый рендерер списка покупок в виде текста."""
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+    extension = 'txt'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return '\n'.join(f'{key}: {value}' for key, value in data.items())
+        return str(data)
+
+    def stream(self, ingredients):
+        """Построчно отдаёт список покупок."""
+        yield 'Список покупок:\n'
+        for ingredient in ingredients:
+            yield (f"- {ingredient['name']}: "
+                   f"{ingredient['total_amount']} "
+                   f"{ingredient['measurement_unit']}\n")
+
+
+class Echo:
+    """Буфер, который сразу возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    """Рендерер списка покупок в формате CSV."""
+    media_type = 'text/csv'
+    format = 'csv'
+    extension = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('Ингредиент', 'Количество',
+                               'Единица измерения'))
+        for ingredient in ingredients:
+            yield writer.writerow((ingredient['name'],
+                                   ingredient['total_amount'],
+                                   ingredient['measurement_unit']))
+
+
+class ShoppingListJSONRenderer(renderers.JSONRenderer):
+    """Рендерер списка покупок в формате JSON."""
+    extension = 'json'
+
+    def stream(self, ingredients):
+        separator = ''
+        yield '['
+        for ingredient in ingredients:
+            yield separator + json.dumps({
+                'name': ingredient['name'],
+                'amount': ingredient['total_amount'],
+                'measurement_unit': ingredient['measurement_unit'],
+            }, ensure_ascii=False)
+            separator = ','
+        yield ']'
@@ -0,0 +1,73 @@
+import bisect
+import threading
+
+from recipes.models import Ingredient
+
+from .cache import get_version
+
+
+def normalize(value):
+    """Приводит строку к виду для поиска без учёта регистра и ё."""
+    return value.strip().casefold().replace('ё', 'е')
+
+
+class IngredientIndex:
+    """
+    Отсортированный индекс названий ингредиентов в памяти процесса.
+    Перестраивается при смене версии ингредиентов в кэше, а если
+    кэш не хранит версии - при каждом обращении.
+    Ключи и id публикуются одним кортежем, чтобы поиск без
+    блокировки не увидел ключи нового индекса с id старого.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.built = False
+        self.index = ([], [])
+        self.lock = threading.Lock()
+
+    def is_current(self, version):
+        return self.built and version == self.version
+
+    def refresh(self):
+        version = get_version('ingredients')
+        if self.is_current(version):
+            return
+        with self.lock:
+            if self.is_current(version):
+                return
+            rows = sorted(
+                (normalize(name), pk)
+                for pk, name in Ingredient.objects.values_list('id', 'name')
+            )
+            self.index = ([key for key, _ in rows], [pk for _, pk in rows])
+            self.version = version
+            self.built = True
+
+    def search(self, query, limit=None):
+        """
+        Возвращает id ингредиентов, название которых начинается
+        с query, и отдельно id тех, где query встречается внутри.
+        """
+        self.refresh()
+        keys, ids = self.index
+        query = normalize(query)
+        prefix_ids = []
+        position = bisect.bisect_left(keys, query)
+        while (position < len(keys) and keys[position].startswith(query)
+               and (limit is None or len(prefix_ids) < limit)):
+            prefix_ids.append(ids[position])
+            position += 1
+        other_ids = []
+        if limit is not None:
+            limit -= len(prefix_ids)
+        if limit is None or limit > 0:
+            for key, pk in zip(keys, ids):
+                if query in key and not key.startswith(query):
+                    other_ids.append(pk)
+                    if len(other_ids) == limit:
+                        break
+        return prefix_ids, other_ids
+
+
+ingredient_index = IngredientIndex()
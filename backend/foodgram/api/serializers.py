@@ -1,14 +1,20 @@
 import collections.abc
+import hashlib
 
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import prefetch_related_objects
 from drf_extra_fields.fields import Base64ImageField
 from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
-                            RecipeIngredient, RecipeTag, Tag)
+                            RecipeIngredient, Tag)
 from rest_framework import exceptions, serializers
-from shopping_cart.models import ShoppingCart
-from users.models import Follow
 
-from .utils import add_recipe_tags_ingredients
+from .cache import get_fragments, get_versions, set_fragments
+from .fields import ImageRenditionsField, RecipeImageField, get_media_url
+from .relations import FAVORITE, FOLLOW, SHOPPING_CART, get_relations
+from .utils import (RECIPE_READ_PREFETCH, add_recipe_tags_ingredients,
+                    get_recipe_cache_tags, get_recipe_read_queryset,
+                    get_recipes_limit, update_recipe_tags_ingredients)
 
 User = get_user_model()
 
@@ -31,6 +37,16 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', )
 
 
+class FollowListSerializer(serializers.ListSerializer):
+    """Список пользователей: подписки проверяются одним запросом."""
+
+    def to_representation(self, data):
+        users = list(data)
+        get_relations(self.context).register(
+            FOLLOW, [user.id for user in users])
+        return super().to_representation(users)
+
+
 class FollowSerializer(UserSerializer):
     """Сериалайзер для пользователей c подписками"""
     is_subscribed = serializers.SerializerMethodField()
@@ -46,19 +62,20 @@ class FollowSerializer(UserSerializer):
         )
         model = User
         read_only_fields = ('id', )
+        list_serializer_class = FollowListSerializer
 
     def get_is_subscribed(self, obj):
         user = self.context['request'].user
         if not user.is_authenticated:
             return False
-        return Follow.objects.filter(user=user,
-                                     author=obj).exists()
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return get_relations(self.context).has(FOLLOW, obj.id)
 
 
 class ShowFollowingsSerializer(FollowSerializer):
     """Сериалайзер для вывода подписок"""
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
@@ -66,20 +83,22 @@ class ShowFollowingsSerializer(FollowSerializer):
                   'first_name', 'last_name', 'is_subscribed',
                   'recipes', 'recipes_count')
         read_only_fields = fields
+        list_serializer_class = FollowListSerializer
 
     def get_recipes(self, obj):
-        request = self.context['request']
-        recipe_limit = request.GET.get('recipes_limit')
-        if recipe_limit:
-            recipes = Recipe.objects.filter(author=obj)[:int(recipe_limit)]
-        else:
-            recipes = Recipe.objects.filter(author=obj)
-        serializer = RecipeSubcribeSerializer(recipes, many=True)
+        if 'authors_recipes' in self.context:
+            serializer = RecipeSubcribeSerializer(
+                self.context['authors_recipes'][obj.id], many=True,
+                context=self.context)
+            return serializer.data
+        recipes_limit = get_recipes_limit(self.context['request'])
+        recipes = Recipe.objects.filter(author=obj)
+        if recipes_limit is not None:
+            recipes = recipes[:recipes_limit]
+        serializer = RecipeSubcribeSerializer(recipes, many=True,
+                                              context=self.context)
         return serializer.data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class PasswordChangeSerializer(serializers.Serializer):
     """Сериалайзер изменения пароля."""
@@ -138,13 +157,53 @@ class IngredientRecipeSerializer(serializers.HyperlinkedModelSerializer):
         )
 
 
+class RecipeReadListSerializer(serializers.ListSerializer):
+    """
+    Список рецептов, собираемый из кэша фрагментов.
+    Фрагмент - не зависящая от пользователя часть рецепта,
+    признаки текущего пользователя подставляются при каждом чтении.
+    Тэги и ингредиенты загружаются только для рецептов без фрагмента.
+    """
+
+    def get_fragment_name(self):
+        # В ссылки на изображения входит адрес сайта из запроса.
+        media_url = get_media_url(self.child.context)
+        return 'recipe-' + hashlib.md5(media_url.encode()).hexdigest()[:8]
+
+    def to_representation(self, data):
+        recipes = list(data)
+        relations = get_relations(self.context)
+        recipe_ids = [recipe.id for recipe in recipes]
+        relations.register(FAVORITE, recipe_ids)
+        relations.register(SHOPPING_CART, recipe_ids)
+        relations.register(FOLLOW, [recipe.author_id for recipe in recipes])
+        name = self.get_fragment_name()
+        fragments = get_fragments(name, [recipe.id for recipe in recipes])
+        missing = [recipe for recipe in recipes if recipe.id not in fragments]
+        if missing:
+            tags = {recipe.id: get_recipe_cache_tags(recipe)
+                    for recipe in missing}
+            versions = get_versions(
+                {tag for names in tags.values() for tag in names})
+            prefetch_related_objects(missing, *RECIPE_READ_PREFETCH)
+            new_fragments = {}
+            for recipe in missing:
+                fragment = self.child.to_fragment(recipe)
+                fragments[recipe.id] = fragment
+                new_fragments[recipe.id] = (fragment, tags[recipe.id])
+            set_fragments(name, new_fragments, versions)
+        return [self.child.add_user_fields(fragments[recipe.id], recipe)
+                for recipe in recipes]
+
+
 class RecipeReadSerializer(serializers.ModelSerializer):
     """Сериалайзер для просмотра рецептов"""
     tags = TagSerializer(many=True)
     author = FollowSerializer()
     ingredients = IngredientRecipeSerializer(
         many=True, source='recipeingredient')
-    image = Base64ImageField()
+    image = RecipeImageField()
+    image_renditions = ImageRenditionsField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -152,20 +211,49 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time')
+            'is_in_shopping_cart', 'name', 'image', 'image_renditions',
+            'text', 'cooking_time')
         read_only_fields = fields
+        list_serializer_class = RecipeReadListSerializer
+
+    def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
+    def to_fragment(self, instance):
+        """Представление рецепта без признаков пользователя."""
+        data = self.to_representation(instance)
+        data['is_favorited'] = None
+        data['is_in_shopping_cart'] = None
+        data['author']['is_subscribed'] = None
+        return data
+
+    def add_user_fields(self, fragment, instance):
+        """Копия фрагмента с признаками текущего пользователя."""
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        data = fragment.copy()
+        data['author'] = fragment['author'].copy()
+        data['author']['is_subscribed'] = (
+            self.fields['author'].get_is_subscribed(instance.author))
+        data['is_favorited'] = self.get_is_favorited(instance)
+        data['is_in_shopping_cart'] = self.get_is_in_shopping_cart(instance)
+        return data
 
     def get_is_favorited(self, obj):
         if self.context['request'].user.is_anonymous:
             return False
-        return FavoriteRecipe.objects.filter(user=self.context['request'].user,
-                                             recipe=obj).exists()
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        return get_relations(self.context).has(FAVORITE, obj.id)
 
     def get_is_in_shopping_cart(self, obj):
         if self.context['request'].user.is_anonymous:
             return False
-        return ShoppingCart.objects.filter(user=self.context['request'].user,
-                                           recipe=obj).exists()
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        return get_relations(self.context).has(SHOPPING_CART, obj.id)
 
 
 class RecipeSerializer(serializers.ModelSerializer):
@@ -204,8 +292,8 @@ class RecipeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 detail='Список ингредиентов не валидный'
             )
+        added_ingredients = []
         for ingredient in ingredients:
-            added_ingredients = []
             if str(ingredient['amount']).isnumeric() is False:
                 raise exceptions.ParseError(
                     'Количество ингредиента должно быть целым числом')
@@ -218,6 +306,7 @@ class RecipeSerializer(serializers.ModelSerializer):
             added_ingredients.append(ingredient.get('id'))
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
@@ -225,19 +314,28 @@ class RecipeSerializer(serializers.ModelSerializer):
         add_recipe_tags_ingredients(tags, ingredients, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        super().update(instance, validated_data)
-        RecipeTag.objects.filter(recipe=instance).delete()
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        add_recipe_tags_ingredients(tags, ingredients, instance)
-        instance.save()
+        changed_fields = [
+            field for field, value in validated_data.items()
+            if getattr(instance, field) != value
+        ]
+        for field in changed_fields:
+            setattr(instance, field, validated_data[field])
+        if changed_fields:
+            instance.save(update_fields=changed_fields)
+        update_recipe_tags_ingredients(
+            tags, ingredients, instance,
+            search_changed=bool({'name', 'text'} & set(changed_fields)))
         return instance
 
     def to_representation(self, instance):
+        request = self.context['request']
+        instance = get_recipe_read_queryset(request.user).get(pk=instance.pk)
         serializer = RecipeReadSerializer(
-            instance, context={'request': self.context['request']})
+            instance, context={'request': request})
         return serializer.data
 
 
@@ -245,7 +343,7 @@ class FavoriteSerializer(serializers.ModelSerializer):
     """Сериалайзер для избранного и списка покупок"""
     id = serializers.ReadOnlyField(source='recipe.id')
     name = serializers.ReadOnlyField(source='recipe.name')
-    image = serializers.ImageField(source='recipe.image')
+    image = RecipeImageField(source='recipe.image')
     cooking_time = serializers.ReadOnlyField(source='recipe.cooking_time')
 
     def validate(self, data):
@@ -261,8 +359,10 @@ class FavoriteSerializer(serializers.ModelSerializer):
 
 class RecipeSubcribeSerializer(serializers.ModelSerializer):
     """Сериалайзер для  вывода рецептов в подписках."""
+    image = RecipeImageField()
+    image_renditions = ImageRenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_renditions', 'cooking_time')
         read_only_fields = fields
@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+from .cache import invalidate_tags_on_commit
+from .utils import (RECIPE_CACHE_TAG, USER_CACHE_TAG, recipe_relations_changed,
+                    update_search_vectors)
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags(**kwargs):
+    invalidate_tags_on_commit('tags')
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredients(**kwargs):
+    invalidate_tags_on_commit('ingredients')
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_recipes_search(instance, created, **kwargs):
+    if not created:
+        update_search_vectors(
+            Recipe.objects.filter(recipeingredient__ingredient=instance))
+
+
+@receiver(pre_delete, sender=Ingredient)
+def remember_ingredient_recipes(instance, **kwargs):
+    instance.recipe_ids = list(RecipeIngredient.objects.filter(
+        ingredient=instance).values_list('recipe_id', flat=True))
+
+
+@receiver(post_delete, sender=Ingredient)
+def update_ingredient_recipes(instance, **kwargs):
+    recipe_relations_changed(getattr(instance, 'recipe_ids', []))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def invalidate_recipe(instance, **kwargs):
+    invalidate_tags_on_commit(RECIPE_CACHE_TAG.format(instance.id))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user(instance, **kwargs):
+    invalidate_tags_on_commit(USER_CACHE_TAG.format(instance.id))
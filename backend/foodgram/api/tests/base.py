@@ -0,0 +1,175 @@
+import base64
+import io
+import json
+import shutil
+import tempfile
+from collections import Counter
+
+from api.utils import update_search_vectors
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredient, RecipeTag, Tag)
+from rest_framework.test import APITestCase
+from shopping_cart.models import ShoppingCart
+from users.models import Follow, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image():
+    """Картинка PNG в виде data URI для Base64ImageField."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (32, 32), color=(200, 80, 40)).save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class FoodgramAPITestCase(APITestCase):
+    """
+    Общий набор данных: авторы с рецептами, подписчики с избранным
+    и списками покупок и читатель, от имени которого идут запросы.
+    """
+    authors_count = 5
+    followers_count = 40
+    recipes_per_author = 12
+    ingredients_count = 200
+    ingredients_per_recipe = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create(
+            username='reader', email='reader@example.com',
+            first_name='Читатель', last_name='Тестовый', password='pass')
+        cls.authors = [
+            User.objects.create(
+                username=f'author{i}', email=f'author{i}@example.com',
+                first_name='Автор', last_name=str(i), password='pass')
+            for i in range(cls.authors_count)
+        ]
+        User.objects.bulk_create(
+            User(username=f'follower{i}', email=f'follower{i}@example.com',
+                 first_name='Подписчик', last_name=str(i), password='pass')
+            for i in range(cls.followers_count))
+        cls.followers = list(
+            User.objects.filter(username__startswith='follower')
+            .order_by('id'))
+        cls.tags = [
+            Tag.objects.create(name=f'Тэг {i}', slug=f'tag{i}',
+                               color=f'#00000{i}')
+            for i in range(3)
+        ]
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент {i}', measurement_unit='г')
+            for i in range(cls.ingredients_count))
+        cls.ingredients = list(Ingredient.objects.order_by('id'))
+        cls.recipes = []
+        for number in range(cls.recipes_per_author * cls.authors_count):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {number}', text='Описание',
+                cooking_time=5 + number, image='recipes/test.png',
+                author=cls.authors[number % cls.authors_count])
+            RecipeTag.objects.bulk_create([
+                RecipeTag(recipe=recipe, tag=cls.tags[number % 3]),
+                RecipeTag(recipe=recipe, tag=cls.tags[(number + 1) % 3]),
+            ])
+            RecipeIngredient.objects.bulk_create([
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=cls.ingredients[
+                        (number + i) % cls.ingredients_count],
+                    amount=10 * (i + 1))
+                for i in range(cls.ingredients_per_recipe)
+            ])
+            cls.recipes.append(recipe)
+        update_search_vectors(Recipe.objects.all())
+        cls.create_relations()
+
+    @classmethod
+    def create_relations(cls):
+        """
+        Читатель подписан на всех авторов, в избранном у него пять
+        рецептов, в списке покупок - четыре. Каждый подписчик
+        подписан на двух авторов и отметил по несколько рецептов.
+        """
+        recipes = cls.recipes
+        follows = [(cls.reader, author) for author in cls.authors]
+        favorites = [(cls.reader, recipe) for recipe in recipes[:5]]
+        cart = [(cls.reader, recipe) for recipe in recipes[:4]]
+        for number, follower in enumerate(cls.followers):
+            follows += [
+                (follower, cls.authors[(number + i) % cls.authors_count])
+                for i in range(2)]
+            favorites += [
+                (follower, recipes[(number + i) % len(recipes)])
+                for i in (0, 7)]
+            cart.append((follower, recipes[(number + 3) % len(recipes)]))
+        Follow.objects.bulk_create(
+            Follow(user=user, author=author) for user, author in follows)
+        FavoriteRecipe.objects.bulk_create(
+            FavoriteRecipe(user=user, recipe=recipe)
+            for user, recipe in favorites)
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=user, recipe=recipe) for user, recipe in cart)
+        followers = Counter(author.id for _, author in follows)
+        for author in cls.authors:
+            User.objects.filter(id=author.id).update(
+                recipes_count=cls.recipes_per_author,
+                followers_count=followers[author.id])
+        for recipe_id, count in Counter(
+                recipe.id for _, recipe in favorites).items():
+            Recipe.objects.filter(id=recipe_id).update(favorites_count=count)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.reader)
+
+    def request(self, method, url, data=None):
+        """Выполняет запрос и возвращает ответ и число запросов к БД."""
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data, format='json')
+            if response.streaming:
+                # Потоковый ответ выполняет запросы при чтении.
+                response.streamed_content = b''.join(
+                    response.streaming_content)
+        return response, context
+
+    def assert_query_budget(self, method, url, max_queries, rows=None,
+                            status=200, data=None):
+        """
+        Проверяет статус ответа, что запросов к БД не больше
+        max_queries и что в ответе rows объектов.
+        """
+        response, context = self.request(method, url, data)
+        self.assertEqual(response.status_code, status,
+                         getattr(response, 'data', None))
+        self.assertLessEqual(
+            len(context), max_queries,
+            '\n'.join(query['sql'] for query in context.captured_queries))
+        if rows is not None:
+            self.assertEqual(count_rows(response), rows)
+        return response
+
+
+def count_rows(response):
+    """Число объектов в ответе: элементы списка или страницы."""
+    if response.streaming:
+        content = response.streamed_content.decode()
+        if response['Content-Type'].startswith('application/json'):
+            return len(json.loads(content))
+        return len(content.splitlines())
+    data = response.data
+    if isinstance(data, dict) and 'results' in data:
+        return len(data['results'])
+    if isinstance(data, list):
+        return len(data)
+    return 1 if data else 0
@@ -0,0 +1,123 @@
+import json
+import os
+import statistics
+import time
+from unittest import skipUnless
+
+from api.relations import UserRelations
+from api.search import ingredient_index
+from api.serializers import RecipeReadSerializer
+from api.utils import get_recipe_read_queryset
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Ingredient
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .base import FoodgramAPITestCase
+
+BENCHMARK = os.getenv('BENCHMARK', False)
+RUNS = int(os.getenv('BENCHMARK_RUNS', 20))
+INGREDIENTS_FILE = os.path.join(settings.BASE_DIR, 'data', 'ingredients.json')
+
+
+def median_ms(func, before=None, runs=RUNS):
+    """Медиана времени выполнения func в миллисекундах."""
+    timings = []
+    for _ in range(runs):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def percentiles_ms(func, args_list):
+    """p50 и p99 времени func(*args) в миллисекундах."""
+    timings = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    quantiles = statistics.quantiles(timings, n=100)
+    return quantiles[49], quantiles[98]
+
+
+@skipUnless(BENCHMARK, 'Бенчмарки запускаются с BENCHMARK=1')
+class RecipeSerializationBenchmark(FoodgramAPITestCase):
+    """
+    Время сериализации 100 рецептов списка: без кэша фрагментов
+    (с догрузкой тэгов и ингредиентов) и из кэша.
+    """
+    recipes_per_author = 20
+
+    def serialize(self):
+        django_request = APIRequestFactory().get('/api/recipes/')
+        force_authenticate(django_request, self.reader)
+        request = Request(django_request)
+        recipes = list(get_recipe_read_queryset(self.reader, prefetch=False))
+        context = {'request': request,
+                   'relations': UserRelations(self.reader)}
+        return lambda: RecipeReadSerializer(
+            recipes, many=True, context=context).data
+
+    def report(self, title, serialize, before=None):
+        if before is not None:
+            before()
+        with CaptureQueriesContext(connection) as context:
+            data = serialize()
+        self.assertEqual(len(data), 100)
+        print(f'\n{title}: {median_ms(serialize, before):.2f} мс '
+              f'на 100 рецептов, запросов к БД: {len(context)}')
+
+    def test_serialization(self):
+        serialize = self.serialize()
+        self.report('Без кэша фрагментов', serialize, before=cache.clear)
+        self.report('Из кэша фрагментов', serialize)
+
+
+@skipUnless(BENCHMARK, 'Бенчмарки запускаются с BENCHMARK=1')
+class IngredientSearchBenchmark(FoodgramAPITestCase):
+    """
+    Задержка поиска ингредиентов на каждое нажатие клавиши:
+    запросы - все префиксы названий из data/ingredients.json.
+    """
+    limit = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        with open(INGREDIENTS_FILE, encoding='utf-8') as data_file:
+            items = json.load(data_file)
+        Ingredient.objects.bulk_create(Ingredient(**item) for item in items)
+        cls.names = sorted({item['name'] for item in items})
+
+    def get_prefixes(self, names):
+        return [name[:length] for name in names
+                for length in range(1, len(name) + 1)]
+
+    def test_index(self):
+        prefixes = self.get_prefixes(self.names)
+        ingredient_index.search('')
+        p50, p99 = percentiles_ms(
+            ingredient_index.search,
+            [(prefix, self.limit) for prefix in prefixes])
+        print(f'\nИндекс, {len(prefixes)} префиксов: '
+              f'p50 {p50:.3f} мс, p99 {p99:.3f} мс')
+
+    def test_endpoint(self):
+        # Префиксы без повторов: ни один ответ не берётся из кэша.
+        prefixes = sorted(set(self.get_prefixes(self.names[::10])))
+        self.client.get('/api/ingredients/', {'name': ''})
+
+        def get(prefix):
+            response = self.client.get(
+                '/api/ingredients/', {'name': prefix, 'limit': self.limit})
+            self.assertEqual(response.status_code, 200)
+
+        p50, p99 = percentiles_ms(get, [(prefix,) for prefix in prefixes])
+        print(f'\nGET /api/ingredients/, {len(prefixes)} префиксов: '
+              f'p50 {p50:.3f} мс, p99 {p99:.3f} мс')
@@ -0,0 +1,32 @@
+from api.cache import get_version
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase
+from recipes.models import Ingredient, Tag
+
+
+class ReferenceVersionTest(TransactionTestCase):
+    """
+    Версии справочников меняются только после фиксации транзакции:
+    до неё параллельный запрос закэшировал бы старые строки
+    под новой версией.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_bumped_on_commit(self, name, change):
+        version = get_version(name)
+        with transaction.atomic():
+            change()
+            self.assertEqual(get_version(name), version)
+        self.assertGreater(get_version(name), version)
+
+    def test_tags(self):
+        self.assert_bumped_on_commit('tags', lambda: Tag.objects.create(
+            name='Завтрак', slug='breakfast', color='#E26C2D'))
+
+    def test_ingredients(self):
+        self.assert_bumped_on_commit(
+            'ingredients', lambda: Ingredient.objects.create(
+                name='соль', measurement_unit='г'))
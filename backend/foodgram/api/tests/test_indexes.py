@@ -0,0 +1,92 @@
+from unittest import skipUnless
+
+from api.filters import RecipeFilter
+from django.db import connection
+from django.http import QueryDict
+from recipes.models import Recipe
+from rest_framework.test import APIRequestFactory
+
+from .base import FoodgramAPITestCase
+
+AUTHOR_INDEXES = {'recipe_author_id_idx'}
+TAG_INDEXES = {'unique_tag_recipe', 'recipetag_recipe_tag_idx'}
+FAVORITE_INDEXES = {'favorite_user_id_idx', 'unique_favorite_users_recipe'}
+CART_INDEXES = {'shopping_cart_user_id_idx',
+                'shopping_cart_user_recipe_unique'}
+INGREDIENT_INDEXES = {'unique_ingredient_recipe',
+                      'recipeingr_recipe_ingr_idx'}
+SEARCH_INDEXES = {'recipe_search_vector_idx'}
+FILTER_INDEXES = (AUTHOR_INDEXES | TAG_INDEXES | FAVORITE_INDEXES
+                  | CART_INDEXES | INGREDIENT_INDEXES | SEARCH_INDEXES)
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Планы запросов проверяются только на PostgreSQL')
+class RecipeFilterIndexTest(FoodgramAPITestCase):
+    """
+    Каждый фильтр списка рецептов и их сочетания используют
+    свои индексы. Последовательное сканирование отключено,
+    чтобы на маленьком наборе данных план был как на большом.
+    План строится без признаков пользователя: их подзапросы
+    сами читают индексы избранного и списка покупок.
+    """
+
+    def setUp(self):
+        super().setUp()
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def get_plan(self, query):
+        request = APIRequestFactory().get('/api/recipes/')
+        request.user = self.reader
+        queryset = RecipeFilter(
+            QueryDict(query),
+            queryset=Recipe.objects.all(),
+            request=request,
+        ).qs
+        return queryset[:6].explain()
+
+    def assert_uses_indexes(self, query, *index_groups):
+        plan = self.get_plan(query)
+        for indexes in index_groups:
+            self.assertTrue(
+                any(index in plan for index in indexes),
+                f'{query}: ни один из {sorted(indexes)} не используется\n'
+                f'{plan}')
+
+    def test_no_filters(self):
+        plan = self.get_plan('')
+        for index in FILTER_INDEXES:
+            self.assertNotIn(index, plan)
+
+    def test_single_filters(self):
+        ingredient = self.ingredients[0].id
+        cases = (
+            (f'author={self.authors[0].id}', AUTHOR_INDEXES),
+            ('tags=tag0&tags=tag1', TAG_INDEXES),
+            ('is_favorited=1', FAVORITE_INDEXES),
+            ('is_in_shopping_cart=1', CART_INDEXES),
+            ('search=рецепт', SEARCH_INDEXES),
+            (f'ingredients={ingredient}', INGREDIENT_INDEXES),
+            (f'any_ingredients={ingredient}', INGREDIENT_INDEXES),
+            (f'exclude_ingredients={ingredient}', INGREDIENT_INDEXES),
+        )
+        for query, indexes in cases:
+            with self.subTest(query=query):
+                self.assert_uses_indexes(query, indexes)
+
+    def test_combined_filters(self):
+        author = self.authors[0].id
+        ingredient = self.ingredients[0].id
+        cases = (
+            (f'author={author}&tags=tag0', AUTHOR_INDEXES, TAG_INDEXES),
+            ('is_favorited=1&tags=tag1', FAVORITE_INDEXES, TAG_INDEXES),
+            (f'is_in_shopping_cart=1&author={author}',
+             CART_INDEXES, AUTHOR_INDEXES),
+            (f'tags=tag2&any_ingredients={ingredient}',
+             TAG_INDEXES, INGREDIENT_INDEXES),
+            ('search=рецепт&tags=tag0', SEARCH_INDEXES, TAG_INDEXES),
+        )
+        for query, *index_groups in cases:
+            with self.subTest(query=query):
+                self.assert_uses_indexes(query, *index_groups)
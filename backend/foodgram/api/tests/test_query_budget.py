@@ -0,0 +1,198 @@
+from django.db import connection
+from rest_framework_simplejwt.tokens import RefreshToken
+from users.models import User
+
+from .base import FoodgramAPITestCase, make_image
+
+
+class UserRoutesQueryBudgetTest(FoodgramAPITestCase):
+    """Число запросов к БД на маршрутах пользователей и токенов."""
+
+    def test_users_list(self):
+        self.assert_query_budget('get', '/api/users/?limit=6', 3, rows=6)
+
+    def test_users_retrieve(self):
+        self.assert_query_budget(
+            'get', f'/api/users/{self.authors[0].id}/', 2, rows=1)
+
+    def test_users_me(self):
+        self.assert_query_budget('get', '/api/users/me/', 1, rows=1)
+
+    def test_users_create(self):
+        self.client.force_authenticate(None)
+        self.assert_query_budget(
+            'post', '/api/users/', 3, rows=1, status=201, data={
+                'email': 'new@example.com', 'username': 'new',
+                'first_name': 'Новый', 'last_name': 'Пользователь',
+                'password': 'pass'})
+        self.assertTrue(User.objects.filter(username='new').exists())
+
+    def test_set_password(self):
+        self.assert_query_budget(
+            'post', '/api/users/set_password/', 1, rows=0, status=204,
+            data={'current_password': 'pass', 'new_password': 'new'})
+        self.reader.refresh_from_db()
+        self.assertEqual(self.reader.password, 'new')
+
+    def test_subscriptions(self):
+        response = self.assert_query_budget(
+            'get', '/api/users/subscriptions/?recipes_limit=3', 3, rows=5)
+        for author in response.data['results']:
+            self.assertEqual(len(author['recipes']), 3)
+
+    def test_invalid_recipes_limit(self):
+        author = User.objects.create(
+            username='other', email='other@example.com',
+            first_name='Другой', last_name='Автор', password='pass')
+        for value in ('abc', '-1', '1.5'):
+            for method, url in (
+                    ('get', '/api/users/subscriptions/'),
+                    ('post', f'/api/users/{author.id}/subscribe/')):
+                with self.subTest(url=url, recipes_limit=value):
+                    self.assert_query_budget(
+                        method, f'{url}?recipes_limit={value}', 3,
+                        status=400)
+        self.assertFalse(author.following.exists())
+
+    def test_subscribe_and_unsubscribe(self):
+        author = User.objects.create(
+            username='other', email='other@example.com',
+            first_name='Другой', last_name='Автор', password='pass')
+        url = f'/api/users/{author.id}/subscribe/'
+        self.assert_query_budget('post', url, 5, rows=1, status=201)
+        self.assert_query_budget('delete', url, 2, status=204)
+
+    def test_token_login_and_logout(self):
+        self.client.force_authenticate(None)
+        self.assert_query_budget(
+            'post', '/api/auth/token/login/', 3, rows=1,
+            data={'email': 'reader@example.com', 'password': 'pass'})
+        self.client.force_authenticate(self.reader)
+        refresh = str(RefreshToken.for_user(self.reader))
+        self.assert_query_budget('post', '/api/auth/token/logout/', 6,
+                                 status=204, data={'refresh': refresh})
+
+
+class ReferenceRoutesQueryBudgetTest(FoodgramAPITestCase):
+    """Число запросов к БД на справочниках."""
+
+    def test_tags(self):
+        self.assert_query_budget('get', '/api/tags/', 1, rows=3)
+        self.assert_query_budget('get', '/api/tags/', 0, rows=3)
+        self.assert_query_budget(
+            'get', f'/api/tags/{self.tags[0].id}/', 1, rows=1)
+
+    def test_ingredients(self):
+        self.assert_query_budget('get', '/api/ingredients/', 1, rows=200)
+        self.assert_query_budget(
+            'get', '/api/ingredients/?limit=10', 1, rows=10)
+        self.assert_query_budget(
+            'get', '/api/ingredients/?name=ингредиент 1&limit=5', 2, rows=5)
+        self.assert_query_budget(
+            'get', '/api/ingredients/?name=ингредиент 1', 2, rows=111)
+        self.assert_query_budget(
+            'get', f'/api/ingredients/{self.ingredients[0].id}/', 1, rows=1)
+
+
+class RecipeRoutesQueryBudgetTest(FoodgramAPITestCase):
+    """Число запросов к БД на маршрутах рецептов."""
+
+    def recipe_data(self, ingredients):
+        return {
+            'name': 'Новый рецепт', 'text': 'Описание', 'cooking_time': 10,
+            'image': make_image(),
+            'tags': [tag.id for tag in self.tags[:2]],
+            'ingredients': [{'id': ingredient.id, 'amount': 5}
+                            for ingredient in ingredients],
+        }
+
+    def test_list(self):
+        self.assert_query_budget('get', '/api/recipes/', 4, rows=6)
+        self.assert_query_budget('get', '/api/recipes/', 2, rows=6)
+
+    def test_list_cursor(self):
+        self.assert_query_budget(
+            'get', '/api/recipes/?pagination=cursor', 3, rows=6)
+
+    def test_list_filters(self):
+        author = self.authors[0].id
+        # Ингредиент входит в три первых рецепта.
+        ingredient = self.ingredients[2].id
+        # Полнотекстовый поиск PostgreSQL находит рецепт 1 и рецепт 0
+        # с «Ингредиентом 1», поиск подстроки - рецепты 1 и 10-19.
+        search_rows = 2 if connection.vendor == 'postgresql' else 11
+        # Тэги добавляют запрос карты слагов, автор - проверку id.
+        cases = (
+            ('tags=tag0&tags=tag1', 5, 6),
+            (f'author={author}', 5, 6),
+            ('is_favorited=1&limit=10', 4, 5),
+            ('is_in_shopping_cart=1&limit=10', 4, 4),
+            ('search=Рецепт 1&limit=20', 4, search_rows),
+            (f'ingredients={ingredient}&limit=20', 4, 3),
+            (f'any_ingredients={ingredient}&limit=20', 4, 3),
+            (f'exclude_ingredients={ingredient}&limit=60', 4, 57),
+            ('cooking_time_min=5&cooking_time_max=9', 4, 5),
+        )
+        for query, max_queries, rows in cases:
+            with self.subTest(query=query):
+                self.assert_query_budget(
+                    'get', f'/api/recipes/?{query}', max_queries, rows=rows)
+
+    def test_retrieve(self):
+        self.assert_query_budget(
+            'get', f'/api/recipes/{self.recipes[0].id}/', 3, rows=1)
+
+    # На PostgreSQL запись ещё один раз пересчитывает поисковый вектор.
+    def test_create(self):
+        self.assert_query_budget(
+            'post', '/api/recipes/', 12, rows=1, status=201,
+            data=self.recipe_data(self.ingredients[:3]))
+
+    def test_partial_update(self):
+        recipe = self.recipes[0]
+        self.client.force_authenticate(recipe.author)
+        self.assert_query_budget(
+            'patch', f'/api/recipes/{recipe.id}/', 15, rows=1,
+            data=self.recipe_data(self.ingredients[5:8]))
+
+    def test_destroy(self):
+        recipe = self.recipes[0]
+        self.client.force_authenticate(recipe.author)
+        self.assert_query_budget(
+            'delete', f'/api/recipes/{recipe.id}/', 8, status=204)
+
+    def test_download_shopping_cart(self):
+        # 6 разных ингредиентов из 4 рецептов и строка заголовка.
+        for extension, rows in (('txt', 7), ('csv', 7), ('json', 6)):
+            with self.subTest(format=extension):
+                self.assert_query_budget(
+                    'get', '/api/recipes/download_shopping_cart/'
+                    f'?format={extension}', 1, rows=rows)
+
+    def test_favorite(self):
+        url = f'/api/recipes/{self.recipes[10].id}/favorite/'
+        self.assert_query_budget('post', url, 2, rows=0, status=201)
+        self.assertTrue(self.recipes[10].favorites.filter(
+            user=self.reader).exists())
+        self.assert_query_budget('post', url, 2, status=400)
+        self.assert_query_budget('delete', url, 2, rows=0, status=204)
+        self.assertFalse(self.recipes[10].favorites.filter(
+            user=self.reader).exists())
+
+    def test_shopping_cart(self):
+        url = f'/api/recipes/{self.recipes[10].id}/shopping_cart/'
+        self.assert_query_budget('post', url, 1, rows=0, status=201)
+        self.assertTrue(self.recipes[10].shopping_cart.filter(
+            user=self.reader).exists())
+        self.assert_query_budget('delete', url, 1, rows=0, status=204)
+
+    def test_bulk(self):
+        # Избранное дополнительно обновляет счётчики рецептов.
+        data = {'add': [recipe.id for recipe in self.recipes[10:20]],
+                'remove': [self.recipes[0].id]}
+        for url, max_queries in (('/api/recipes/favorite/bulk/', 8),
+                                 ('/api/recipes/shopping_cart/bulk/', 6)):
+            with self.subTest(url=url):
+                response = self.assert_query_budget(
+                    'post', url, max_queries, data=data)
+                self.assertEqual(len(response.data['results']), 11)
@@ -0,0 +1,109 @@
+from unittest import skipUnless
+
+from django.db import connection
+
+from .base import FoodgramAPITestCase, make_image
+
+
+class RecipeQueryCountTest(FoodgramAPITestCase):
+    """
+    Число запросов к рецептам не зависит от размера страницы
+    и от числа тэгов и ингредиентов.
+    """
+
+    def count_queries(self, method, url, data=None, status=200):
+        self.setUp()
+        response, context = self.request(method, url, data)
+        self.assertEqual(response.status_code, status,
+                         getattr(response, 'data', None))
+        return len(context)
+
+    def recipe_data(self, tags, ingredients):
+        return {
+            'name': 'Новый рецепт', 'text': 'Описание', 'cooking_time': 10,
+            'image': make_image(),
+            'tags': [tag.id for tag in tags],
+            'ingredients': [{'id': ingredient.id, 'amount': 5}
+                            for ingredient in ingredients],
+        }
+
+    def test_list_page_size(self):
+        self.assertEqual(
+            self.count_queries('get', '/api/recipes/?limit=6'),
+            self.count_queries('get', '/api/recipes/?limit=12'))
+
+    def test_retrieve_relations(self):
+        recipe = self.recipes[0]
+        url = f'/api/recipes/{recipe.id}/'
+        before = self.count_queries('get', url)
+        recipe.recipe_tags.create(tag=self.tags[2])
+        for ingredient in self.ingredients[10:15]:
+            recipe.recipeingredient.create(ingredient=ingredient, amount=1)
+        self.assertEqual(before, self.count_queries('get', url))
+
+    def test_create_relations(self):
+        self.assertEqual(
+            self.count_queries(
+                'post', '/api/recipes/',
+                self.recipe_data(self.tags[:1], self.ingredients[:2]), 201),
+            self.count_queries(
+                'post', '/api/recipes/',
+                self.recipe_data(self.tags, self.ingredients[:12]), 201))
+
+    def test_update_relations(self):
+        author = self.authors[0]
+        first, second = [recipe for recipe in self.recipes
+                         if recipe.author == author][:2]
+        counts = []
+        for recipe, tags, ingredients in (
+                (first, self.tags[:1], self.ingredients[10:12]),
+                (second, self.tags, self.ingredients[8:20])):
+            self.setUp()
+            self.client.force_authenticate(author)
+            response, context = self.request(
+                'patch', f'/api/recipes/{recipe.id}/',
+                self.recipe_data(tags, ingredients))
+            self.assertEqual(response.status_code, 200, response.data)
+            counts.append(len(context))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(second.ingredients.count(), 12)
+
+
+@skipUnless(connection.vendor == 'postgresql',
+            'Поисковые векторы есть только на PostgreSQL')
+class RecipeSearchVectorTest(FoodgramAPITestCase):
+    """Запись рецепта пересчитывает поисковый вектор ровно один раз."""
+
+    def count_vector_updates(self, method, url, data, status):
+        response, context = self.request(method, url, data)
+        self.assertEqual(response.status_code, status, response.data)
+        return sum('"search_vector" =' in query['sql']
+                   for query in context.captured_queries)
+
+    def recipe_data(self, name, ingredients):
+        return {
+            'name': name, 'text': 'Описание', 'cooking_time': 10,
+            'image': make_image(), 'tags': [self.tags[0].id],
+            'ingredients': [{'id': ingredient.id, 'amount': 5}
+                            for ingredient in ingredients],
+        }
+
+    def test_create_and_update(self):
+        self.client.force_authenticate(self.authors[0])
+        self.assertEqual(self.count_vector_updates(
+            'post', '/api/recipes/',
+            self.recipe_data('Борщ', self.ingredients[:2]), 201), 1)
+        recipe = self.authors[0].recipes.get(name='Борщ')
+        url = f'/api/recipes/{recipe.id}/'
+        self.assertEqual(self.count_vector_updates(
+            'patch', url,
+            self.recipe_data('Щи', self.ingredients[2:4]), 200), 1)
+        self.assertEqual(self.count_vector_updates(
+            'patch', url,
+            self.recipe_data('Щи', self.ingredients[2:4]), 200), 0)
+        self.assertEqual(self.count_vector_updates(
+            'patch', url,
+            self.recipe_data('Солянка', self.ingredients[2:4]), 200), 1)
+        response, _ = self.request('get', '/api/recipes/?search=солянка')
+        self.assertEqual(
+            [item['id'] for item in response.data['results']], [recipe.id])
@@ -1,9 +1,10 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import (APIToken, BlacklistRefresh, FavoriteView, FollowView,
-                    IngredientViewSet, RecipeViewSet, ShoppingCartView,
-                    TagViewSet, UserViewSet)
+from .views import (APIToken, BlacklistRefresh, FavoriteBulkView, FavoriteView,
+                    FollowView, IngredientViewSet, RecipeViewSet,
+                    ShoppingCartBulkView, ShoppingCartView, TagViewSet,
+                    UserViewSet)
 
 app_name = 'api'
 
@@ -23,5 +24,9 @@ urlpatterns = [
          FavoriteView.as_view(), name='favorite'),
     path('recipes/<int:recipe_id>/shopping_cart/',
          ShoppingCartView.as_view(), name='cart'),
+    path('recipes/favorite/bulk/',
+         FavoriteBulkView.as_view(), name='favorite_bulk'),
+    path('recipes/shopping_cart/bulk/',
+         ShoppingCartBulkView.as_view(), name='cart_bulk'),
     path('', include(router.urls)),
 ]
@@ -1,15 +1,319 @@
-from django.shortcuts import get_object_or_404
-from recipes.models import Ingredient, RecipeIngredient, RecipeTag, Tag
+from django.contrib.postgres.search import SearchVector
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import (Exists, F, OuterRef, Prefetch, Subquery, Sum,
+                              TextField, Window)
+from django.db.models.functions import RowNumber
+from recipes.models import (FavoriteRecipe, Ingredient, Recipe,
+                            RecipeIngredient, RecipeTag, Tag)
+from rest_framework import serializers
+from shopping_cart.models import ShoppingCart
+from users.models import Follow
+
+from .cache import (REFERENCE_CACHE_TIMEOUT, get_version,
+                    invalidate_tags_on_commit)
+
+SEARCH_CONFIG = 'russian'
+RECIPE_CACHE_TAG = 'recipe:{}'
+USER_CACHE_TAG = 'user:{}'
+RECIPE_READ_PREFETCH = (
+    'tags',
+    Prefetch(
+        'recipeingredient',
+        queryset=RecipeIngredient.objects.select_related('ingredient'),
+    ),
+)
+
+
+def get_valid_ids(ids):
+    valid = []
+    for pk in ids:
+        try:
+            valid.append(int(pk))
+        except (TypeError, ValueError):
+            pass
+    return valid
+
+
+def get_missing_ids(ids, found):
+    missing = []
+    for pk in ids:
+        try:
+            if int(pk) not in found:
+                missing.append(pk)
+        except (TypeError, ValueError):
+            missing.append(pk)
+    return missing
+
+
+def resolve_tags_ingredients(tags, ingredients):
+    """
+    Проверяет id тэгов и ингредиентов одним запросом на модель.
+    Возвращает список id тэгов и словарь {id ингредиента: количество}.
+    """
+    tags = list(dict.fromkeys(tags))
+    ingredient_ids = [ingredient['id'] for ingredient in ingredients]
+    found_ingredients = Ingredient.objects.in_bulk(
+        get_valid_ids(ingredient_ids))
+    found_tags = Tag.objects.in_bulk(get_valid_ids(tags))
+    errors = {}
+    missing_ingredients = get_missing_ids(ingredient_ids, found_ingredients)
+    if missing_ingredients:
+        errors['ingredients'] = [
+            'Ингредиенты не найдены: '
+            + ', '.join(str(pk) for pk in missing_ingredients)]
+    missing_tags = get_missing_ids(tags, found_tags)
+    if missing_tags:
+        errors['tags'] = [
+            'Тэги не найдены: ' + ', '.join(str(pk) for pk in missing_tags)]
+    if errors:
+        raise serializers.ValidationError(errors)
+    amounts = {int(ingredient['id']): int(ingredient['amount'])
+               for ingredient in ingredients}
+    return [int(tag) for tag in tags], amounts
 
 
 def add_recipe_tags_ingredients(tags, ingredients, recipe):
     """Метод для создания ингрединтов и тэгов в рецепте"""
-
+    tag_ids, amounts = resolve_tags_ingredients(tags, ingredients)
     RecipeIngredient.objects.bulk_create(
-        [RecipeIngredient(
-            ingredient=get_object_or_404(Ingredient, id=ingredient['id']),
-            recipe=recipe,
-            amount=ingredient['amount']) for ingredient in ingredients])
+        [RecipeIngredient(ingredient_id=ingredient_id,
+                          recipe=recipe,
+                          amount=amount)
+         for ingredient_id, amount in amounts.items()])
     RecipeTag.objects.bulk_create(
-        [RecipeTag(tag=get_object_or_404(Tag, id=tag),
-                   recipe=recipe) for tag in tags])
+        [RecipeTag(tag_id=tag_id, recipe=recipe) for tag_id in tag_ids])
+    update_search_vectors(Recipe.objects.filter(id=recipe.id))
+
+
+def update_recipe_tags_ingredients(tags, ingredients, recipe,
+                                   search_changed=False):
+    """
+    Метод для изменения ингредиентов и тэгов в рецепте:
+    удаляются, добавляются и обновляются только изменившиеся связи.
+    search_changed - изменились название или описание рецепта.
+    """
+    tag_ids, amounts = resolve_tags_ingredients(tags, ingredients)
+
+    current_ingredients = {
+        recipe_ingredient.ingredient_id: recipe_ingredient
+        for recipe_ingredient in RecipeIngredient.objects.filter(
+            recipe=recipe)
+    }
+    removed_ingredients = current_ingredients.keys() - amounts.keys()
+    if removed_ingredients:
+        RecipeIngredient.objects.filter(
+            recipe=recipe, ingredient_id__in=removed_ingredients).delete()
+    added_ingredients = [
+        RecipeIngredient(ingredient_id=ingredient_id,
+                         recipe=recipe,
+                         amount=amount)
+        for ingredient_id, amount in amounts.items()
+        if ingredient_id not in current_ingredients
+    ]
+    if added_ingredients:
+        RecipeIngredient.objects.bulk_create(added_ingredients)
+    changed_ingredients = []
+    for ingredient_id, amount in amounts.items():
+        current = current_ingredients.get(ingredient_id)
+        if current is not None and current.amount != amount:
+            current.amount = amount
+            changed_ingredients.append(current)
+    if changed_ingredients:
+        RecipeIngredient.objects.bulk_update(changed_ingredients, ['amount'])
+
+    current_tags = set(RecipeTag.objects.filter(
+        recipe=recipe).values_list('tag_id', flat=True))
+    removed_tags = current_tags - set(tag_ids)
+    if removed_tags:
+        RecipeTag.objects.filter(recipe=recipe,
+                                 tag_id__in=removed_tags).delete()
+    added_tags = [RecipeTag(tag_id=tag_id, recipe=recipe)
+                  for tag_id in tag_ids if tag_id not in current_tags]
+    if added_tags:
+        RecipeTag.objects.bulk_create(added_tags)
+
+    ingredients_changed = bool(removed_ingredients or added_ingredients)
+    if ingredients_changed or search_changed:
+        update_search_vectors(Recipe.objects.filter(id=recipe.id))
+    if (ingredients_changed or changed_ingredients
+            or removed_tags or added_tags):
+        invalidate_tags_on_commit(RECIPE_CACHE_TAG.format(recipe.id))
+
+
+def update_search_vectors(queryset):
+    """
+    Пересчитывает поисковые векторы рецептов: название, ингредиенты
+    и описание с весами A, B и C. Работает только на PostgreSQL.
+    Вызывается один раз в конце записи рецепта и его связей,
+    сигнал сохранения рецепта вектор не пересчитывает.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    # Модуль агрегатов требует psycopg2, которого нет у SQLite.
+    from django.contrib.postgres.aggregates import StringAgg
+    ingredient_names = RecipeIngredient.objects.filter(
+        recipe=OuterRef('pk')
+    ).order_by().values('recipe').annotate(
+        names=StringAgg('ingredient__name', delimiter=' ')
+    ).values('names')
+    queryset.update(search_vector=(
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(Subquery(ingredient_names, output_field=TextField()),
+                       weight='B', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='C', config=SEARCH_CONFIG)
+    ))
+
+
+def recipe_relations_changed(recipe_ids):
+    """
+    Сбрасывает фрагменты рецептов и пересчитывает их поисковые
+    векторы: вызывается один раз после изменения связей,
+    а не на каждую строку.
+    """
+    if recipe_ids:
+        invalidate_tags_on_commit(
+            *(RECIPE_CACHE_TAG.format(pk) for pk in recipe_ids))
+        update_search_vectors(Recipe.objects.filter(id__in=recipe_ids))
+
+
+def get_recipe_read_queryset(user, queryset=None, prefetch=True):
+    """
+    Queryset рецептов для RecipeReadSerializer: автор, тэги
+    и ингредиенты загружаются фиксированным числом запросов,
+    признаки избранного, списка покупок и подписки на автора
+    вычисляются в том же запросе.
+    С prefetch=False тэги и ингредиенты не загружаются:
+    их догружает сериалайзер списка для рецептов без кэша.
+    """
+    if queryset is None:
+        queryset = Recipe.objects.all()
+    queryset = queryset.select_related('author').defer('search_vector')
+    if prefetch:
+        queryset = queryset.prefetch_related(*RECIPE_READ_PREFETCH)
+    if user.is_anonymous:
+        return queryset
+    return queryset.annotate(
+        is_favorited=Exists(FavoriteRecipe.objects.filter(
+            user=user, recipe=OuterRef('pk'))),
+        is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+            user=user, recipe=OuterRef('pk'))),
+        author_is_subscribed=Exists(Follow.objects.filter(
+            user=user, author=OuterRef('author'))),
+    )
+
+
+def get_recipe_cache_tags(recipe):
+    """Теги кэша, от которых зависит фрагмент рецепта."""
+    return (RECIPE_CACHE_TAG.format(recipe.id),
+            USER_CACHE_TAG.format(recipe.author_id),
+            'tags', 'ingredients')
+
+
+def get_recipes_limit(request):
+    """
+    Значение ?recipes_limit= или None, если оно не передано.
+    Нецелое или отрицательное значение - ошибка 400.
+    """
+    value = request.query_params.get('recipes_limit')
+    if not value:
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        raise serializers.ValidationError(
+            {'recipes_limit': 'Ожидается неотрицательное целое число'})
+    return limit
+
+
+def get_authors_recipes(author_ids, limit=None):
+    """
+    Возвращает словарь {id автора: [рецепты]} с не более чем limit
+    последними рецептами каждого автора, полученный одним запросом.
+    """
+    queryset = Recipe.objects.filter(author_id__in=author_ids).only(
+        'id', 'name', 'image', 'image_hash', 'cooking_time', 'author_id')
+    if limit is not None:
+        ranked = queryset.order_by().annotate(recipe_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=F('id').desc(),
+        ))
+        sql, params = ranked.query.sql_with_params()
+        queryset = Recipe.objects.raw(
+            f'SELECT * FROM ({sql}) ranked '
+            f'WHERE ranked.recipe_rank <= %s ORDER BY ranked.id DESC',
+            params + (limit,),
+        )
+    authors_recipes = {author_id: [] for author_id in author_ids}
+    for recipe in queryset:
+        authors_recipes[recipe.author_id].append(recipe)
+    return authors_recipes
+
+
+def get_shopping_list(user):
+    """
+    Суммирует ингредиенты рецептов из списка покупок пользователя
+    на стороне БД, группируя их по ингредиенту.
+    """
+    return RecipeIngredient.objects.filter(
+        recipe__shopping_cart__user=user
+    ).values('ingredient').annotate(
+        name=F('ingredient__name'),
+        measurement_unit=F('ingredient__measurement_unit'),
+        total_amount=Sum('amount'),
+    ).order_by('name', 'measurement_unit').iterator()
+
+
+def get_tag_slug_map():
+    """Словарь {slug: id} тэгов, кэшируемый до изменения тэгов."""
+    key = f"tags:{get_version('tags')}:slug-map"
+    slug_map = cache.get(key)
+    if slug_map is None:
+        slug_map = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, slug_map, timeout=REFERENCE_CACHE_TIMEOUT)
+    return slug_map
+
+
+def update_counter(queryset, field, delta):
+    """Атомарно меняет счётчик field у объектов queryset на delta."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def add_user_relation(model, user_id, field, target_id):
+    """
+    Создаёт связь пользователя с объектом одним запросом.
+    Возвращает True, если строка добавлена.
+    """
+    return bool(add_user_relations(model, user_id, field, [target_id]))
+
+
+def add_user_relations(model, user_id, field, target_ids):
+    """
+    Создаёт связи пользователя с объектами одним запросом
+    INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING.
+    Возвращает множество id объектов, для которых строка добавлена:
+    несуществующие объекты и уже имеющиеся связи пропускаются.
+    """
+    if not target_ids:
+        return set()
+    quote = connection.ops.quote_name
+    opts = model._meta
+    target_field = opts.get_field(field)
+    target_opts = target_field.related_model._meta
+    target_pk = quote(target_opts.pk.column)
+    sql = (
+        f'INSERT INTO {quote(opts.db_table)} '
+        f'({quote(opts.get_field("user").column)}, '
+        f'{quote(target_field.column)}) '
+        f'SELECT %s, {target_pk} FROM {quote(target_opts.db_table)} '
+        f'WHERE {target_pk} IN ({", ".join(["%s"] * len(target_ids))}) '
+        f'ON CONFLICT DO NOTHING RETURNING {quote(target_field.column)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, *target_ids])
+        return {row[0] for row in cursor.fetchall()}
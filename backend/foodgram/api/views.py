@@ -1,10 +1,12 @@
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import BooleanField, Value
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from recipes.models import FavoriteRecipe, Ingredient, Recipe, Tag
-from rest_framework import generics, mixins, status, viewsets
+from rest_framework import (exceptions, generics, mixins, status, views,
+                            viewsets)
 from rest_framework.decorators import action
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
@@ -15,19 +17,26 @@ from shopping_cart.serializers import ShoppingCartSerializer
 from users.models import Follow
 
 from .filters import IngredientFilter, RecipeFilter
+from .mixins import CachedReadOnlyMixin, RelationsContextMixin
 from .pagination import RecipePagination
 from .permissions import IsOwnerOrReadOnly
+from .renderers import (ShoppingListCSVRenderer, ShoppingListJSONRenderer,
+                        ShoppingListRenderer)
 from .serializers import (FavoriteSerializer, FollowSerializer,
                           IngredientSerializer, JWTTokenSerializer,
                           PasswordChangeSerializer, RecipeReadSerializer,
                           RecipeSerializer, ShowFollowingsSerializer,
                           TagSerializer, UserSerializer)
+from .utils import (add_user_relation, add_user_relations, get_authors_recipes,
+                    get_recipe_read_queryset, get_recipes_limit,
+                    get_shopping_list, update_counter)
 
 User = get_user_model()
 
 
-class UserViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
-                  mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+class UserViewSet(RelationsContextMixin, mixins.CreateModelMixin,
+                  mixins.ListModelMixin, mixins.RetrieveModelMixin,
+                  viewsets.GenericViewSet):
     """Вьюсет для работы с пользователями."""
 
     queryset = User.objects.all()
@@ -63,11 +72,19 @@ class UserViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
     @action(detail=False, methods=['get'],
             url_name='subscriptions', permission_classes=(IsAuthenticated,))
     def subscriptions(self, request, *args, **kwargs):
-        queryset = User.objects.filter(following__user=request.user.id)
+        queryset = User.objects.filter(
+            following__user=request.user.id
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        )
         page = self.paginate_queryset(queryset)
         if page is not None:
+            authors_recipes = get_authors_recipes(
+                [author.id for author in page], get_recipes_limit(request))
             serializer = ShowFollowingsSerializer(
-                page, many=True, context={'request': request},)
+                page, many=True,
+                context={'request': request,
+                         'authors_recipes': authors_recipes},)
             return self.get_paginated_response(serializer.data)
 
 
@@ -102,30 +119,46 @@ class FollowView(generics.CreateAPIView,
     serializer_class = FollowSerializer
 
     def post(self, request, user_id):
-        author = get_object_or_404(User, id=user_id)
-        Follow.objects.create(user=self.request.user, author=author)
+        # Проверяется до записи, чтобы ошибка не оставила подписку.
+        get_recipes_limit(request)
+        if user_id == request.user.id:
+            return Response({'errors': 'Нельзя подписаться на себя'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not add_user_relation(Follow, request.user.id, 'author', user_id):
+            get_object_or_404(User, id=user_id)
+            return Response({'errors': 'Вы уже подписаны на автора'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        update_counter(User.objects.filter(id=user_id),
+                       'followers_count', 1)
+        author = User.objects.get(id=user_id)
         serializer = ShowFollowingsSerializer(author,
                                               context={'request': request})
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, user_id):
-        author = get_object_or_404(User, id=user_id)
-        delete_following = Follow.objects.filter(user=self.request.user,
-                                                 author=author)
-        delete_following.delete()
+        deleted, _ = Follow.objects.filter(user=request.user,
+                                           author_id=user_id).delete()
+        if not deleted:
+            get_object_or_404(User, id=user_id)
+            return Response({'errors': 'Вы не подписаны на автора'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        update_counter(User.objects.filter(id=user_id),
+                       'followers_count', -deleted)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CachedReadOnlyMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для работы с тэгами."""
+    cache_version_name = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CachedReadOnlyMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для работы с ингредиентами."""
+    cache_version_name = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
@@ -134,7 +167,7 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(RelationsContextMixin, viewsets.ModelViewSet):
     """Вьюсет для работы с рецептами"""
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly)
@@ -142,6 +175,18 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filterset_class = RecipeFilter
     pagination_class = RecipePagination
 
+    def get_queryset(self):
+        """
+        Для чтения возвращает рецепты со связанными объектами
+        и признаками для текущего пользователя.
+        """
+        if self.action == 'list':
+            return get_recipe_read_queryset(self.request.user,
+                                            prefetch=False)
+        if self.action == 'retrieve':
+            return get_recipe_read_queryset(self.request.user)
+        return Recipe.objects.all()
+
     def get_serializer_class(self):
         """
         В зависимости от метода
@@ -153,40 +198,36 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+        update_counter(User.objects.filter(id=self.request.user.id),
+                       'recipes_count', 1)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        update_counter(User.objects.filter(id=instance.author_id),
+                       'recipes_count', -1)
 
     @action(
         detail=False,
         methods=['get'],
         url_path='download_shopping_cart',
         permission_classes=(IsAuthenticated,),
+        renderer_classes=(ShoppingListRenderer, ShoppingListCSVRenderer,
+                          ShoppingListJSONRenderer),
     )
     def download_shopping_cart(self, request, *args, **kwargs):
-        current_user = request.user
-        try:
-            shopping_recipes = Recipe.objects.filter(
-                shopping_cart__user=current_user
-            )
-            name = 'recipeingredient__ingredient__name'
-            measurement_unit = 'recipeingredient__ingredient__measurement_unit'
-            amount = 'recipeingredient__amount'
-            ingredients = shopping_recipes.values(
-                name,
-                measurement_unit,
-                amount
-            ).order_by(name)
-            total = ingredients.annotate(
-                amount=Sum('recipeingredient__amount')
-            )
-            shopping_cart = 'Список покупок:'
-            for ingredient in total:
-                shopping_cart += (
-                    f"\n- {ingredient[name]}: "
-                    f"{ingredient[amount]} "
-                    f"{ingredient[measurement_unit]}"
-                )
-            return HttpResponse(shopping_cart, content_type='text/plain')
-        except:
-            raise Exception('Список покупок пуст')
+        """
+        Отдаёт список покупок потоком в формате,
+        выбранном через ?format=txt|csv|json.
+        """
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(get_shopping_list(request.user)),
+            content_type=f'{renderer.media_type}; charset=utf-8',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="shopping_list.{renderer.extension}"'
+        )
+        return response
 
     @action(
         detail=True,
@@ -200,7 +241,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 'user': self.request.user.id,
                 'recipe': kwargs.get('pk'),
             }
-            serializer = ShoppingCartSerializer(data=data)
+            serializer = ShoppingCartSerializer(
+                data=data, context={'request': request})
             serializer.is_valid(raise_exception=True)
             serializer.save()
             headers = self.get_success_headers(serializer.data)
@@ -217,20 +259,37 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
 class BaseView(generics.CreateAPIView,
                generics.DestroyAPIView):
-    """Базовый вью."""
+    """
+    Базовый вью для добавления рецепта в список пользователя
+    и удаления из него.
+    """
+    counter_field = None
+    exists_message = 'Рецепт уже добавлен'
+    missing_message = 'Рецепта нет в списке'
 
     def create(self, request, *args, **kwargs):
         recipe_id = self.kwargs['recipe_id']
-        recipe = get_object_or_404(Recipe, id=recipe_id)
-        self.model.objects.create(user=request.user, recipe=recipe)
+        if not add_user_relation(self.model, request.user.id,
+                                 'recipe', recipe_id):
+            get_object_or_404(Recipe, id=recipe_id)
+            return Response({'errors': self.exists_message},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if self.counter_field:
+            update_counter(Recipe.objects.filter(id=recipe_id),
+                           self.counter_field, 1)
         return Response(request.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, *args, **kwargs):
         recipe_id = self.kwargs['recipe_id']
-        obj = get_object_or_404(
-            self.model, user__id=request.user.id, recipe__id=recipe_id
-        )
-        obj.delete()
+        deleted, _ = self.model.objects.filter(
+            user=request.user, recipe_id=recipe_id).delete()
+        if not deleted:
+            get_object_or_404(Recipe, id=recipe_id)
+            return Response({'errors': self.missing_message},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if self.counter_field:
+            update_counter(Recipe.objects.filter(id=recipe_id),
+                           self.counter_field, -deleted)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -239,6 +298,9 @@ class FavoriteView(BaseView):
     queryset = FavoriteRecipe.objects.all()
     serializer_class = FavoriteSerializer
     model = FavoriteRecipe
+    counter_field = 'favorites_count'
+    exists_message = 'Этот рецепт уже в избранном'
+    missing_message = 'Этого рецепта нет в избранном'
 
 
 class ShoppingCartView(BaseView):
@@ -246,3 +308,85 @@ class ShoppingCartView(BaseView):
     queryset = ShoppingCart.objects.all()
     serializer_class = ShoppingCartSerializer
     model = ShoppingCart
+    exists_message = 'Рецепт уже в списке покупок'
+    missing_message = 'Этого рецепта нет в списке покупок'
+
+
+class BaseBulkView(views.APIView):
+    """
+    Базовый вью для добавления и удаления нескольких рецептов
+    одним запросом: {"add": [id, ...], "remove": [id, ...]}.
+    """
+    model = None
+    counter_field = None
+    max_ids = 100
+
+    def get_ids(self, key):
+        ids = self.request.data.get(key, [])
+        if not isinstance(ids, list) or len(ids) > self.max_ids:
+            raise exceptions.ValidationError(
+                {key: f'Ожидается список не более чем из {self.max_ids} id'})
+        if any(isinstance(pk, bool) for pk in ids):
+            raise exceptions.ValidationError(
+                {key: 'id рецептов должны быть целыми числами'})
+        try:
+            return list(dict.fromkeys(int(pk) for pk in ids))
+        except (TypeError, ValueError):
+            raise exceptions.ValidationError(
+                {key: 'id рецептов должны быть целыми числами'})
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            raise exceptions.ValidationError(
+                'Ожидается объект {"add": [...], "remove": [...]}')
+        add_ids = self.get_ids('add')
+        remove_ids = self.get_ids('remove')
+        if set(add_ids) & set(remove_ids):
+            raise exceptions.ValidationError(
+                'Один рецепт нельзя одновременно добавить и удалить')
+        with transaction.atomic():
+            found = set(Recipe.objects.filter(
+                id__in=add_ids + remove_ids
+            ).order_by().values_list('id', flat=True))
+            added = add_user_relations(self.model, request.user.id,
+                                       'recipe', add_ids)
+            # Блокировка строк: параллельное удаление той же связи
+            # дождётся этой транзакции и не уменьшит счётчик дважды.
+            removed = set(self.model.objects.select_for_update().filter(
+                user=request.user, recipe_id__in=remove_ids
+            ).values_list('recipe_id', flat=True))
+            if removed:
+                self.model.objects.filter(
+                    user=request.user, recipe_id__in=removed).delete()
+            if self.counter_field:
+                update_counter(Recipe.objects.filter(id__in=added),
+                               self.counter_field, 1)
+                update_counter(Recipe.objects.filter(id__in=removed),
+                               self.counter_field, -1)
+        results = [
+            {'id': pk, 'status': self.get_status(
+                pk, found, pk in added, 'added', 'already_added')}
+            for pk in add_ids
+        ] + [
+            {'id': pk, 'status': self.get_status(
+                pk, found, pk in removed, 'removed', 'not_present')}
+            for pk in remove_ids
+        ]
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    @staticmethod
+    def get_status(pk, found, changed, changed_status, unchanged_status):
+        if pk not in found:
+            return 'not_found'
+        return changed_status if changed else unchanged_status
+
+
+class FavoriteBulkView(BaseBulkView):
+    """Вьюкласс для изменения избранного списком."""
+    model = FavoriteRecipe
+    counter_field = 'favorites_count'
+
+
+class ShoppingCartBulkView(BaseBulkView):
+    """Вьюкласс для изменения списка покупок списком."""
+    model = ShoppingCart
@@ -0,0 +1,72 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись лога в одну JSON-строку."""
+
+    def format(self, record):
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+        }
+        if isinstance(getattr(record, 'data', None), dict):
+            data.update(record.data)
+        else:
+            data['message'] = record.getMessage()
+        if getattr(record, 'sql', None) is not None:
+            data['sql'] = record.sql
+        if getattr(record, 'duration', None) is not None:
+            data['duration_ms'] = round(record.duration * 1000, 2)
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class QueueRotatingFileHandler(logging.handlers.QueueHandler):
+    """
+    Складывает записи в очередь, а пишет их в ротируемый файл
+    фоновый поток QueueListener, не блокируя обработку запроса.
+    """
+
+    def __init__(self, filename, max_bytes=0, backup_count=0,
+                 encoding='utf-8'):
+        super().__init__(queue.Queue(-1))
+        self.file_handler = logging.handlers.RotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backup_count,
+            encoding=encoding, delay=True)
+        self.listener = logging.handlers.QueueListener(
+            self.queue, self.file_handler)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            self.file_handler.close()
+        super().close()
+
+
+class SqlSamplingFilter(logging.Filter):
+    """
+    Пропускает SQL-записи, выполнявшиеся не менее slow_ms,
+    и случайную долю sample_rate остальных.
+    """
+
+    def __init__(self, slow_ms=0, sample_rate=0.0):
+        super().__init__()
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        duration = getattr(record, 'duration', None)
+        if duration is None:
+            return True
+        return (duration * 1000 >= self.slow_ms
+                or random.random() < self.sample_rate)
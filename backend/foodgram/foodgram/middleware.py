@@ -0,0 +1,93 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('foodgram.performance')
+sql_logger = logging.getLogger('django.db.backends')
+
+SLOWEST_QUERY_LENGTH = 1000
+
+
+class QueryStats:
+    """
+    Обёртка execute_wrapper, собирающая статистику запросов к БД.
+    Без DEBUG Django не логирует SQL, поэтому запросы передаются
+    в django.db.backends отсюда, а отбор медленных и выборки
+    выполняет фильтр логгера.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_duration = 0.0
+        self.slowest_sql = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            if duration >= self.slowest_duration:
+                self.slowest_duration = duration
+                self.slowest_sql = sql
+            if (not context['connection'].queries_logged
+                    and sql_logger.isEnabledFor(logging.DEBUG)):
+                sql_logger.debug(
+                    '(%.3f) %s; args=%s', duration, sql, params,
+                    extra={'duration': duration, 'sql': sql,
+                           'params': params})
+
+
+class PerformanceMiddleware:
+    """
+    Замеряет время запроса, число и время SQL-запросов, самый
+    медленный запрос и размер ответа. Добавляет заголовок
+    Server-Timing и пишет строку в лог foodgram.performance:
+    медленные запросы - с уровнем WARNING, остальные - INFO.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        total = (time.perf_counter() - started) * 1000
+        db_total = stats.duration * 1000
+
+        if settings.PERFORMANCE_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'db;dur={db_total:.1f};desc="{stats.count} queries", '
+                f'total;dur={total:.1f}'
+            )
+        match = request.resolver_match
+        data = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(total, 1),
+            'queries': stats.count,
+            'db_duration_ms': round(db_total, 1),
+            'slowest_query_ms': round(stats.slowest_duration * 1000, 1),
+            'slowest_query': (stats.slowest_sql or '')[:SLOWEST_QUERY_LENGTH],
+            'response_bytes': (None if response.streaming
+                               else len(response.content)),
+        }
+        level = (logging.WARNING
+                 if total >= settings.PERFORMANCE_SLOW_REQUEST_MS
+                 else logging.INFO)
+        logger.log(level, json.dumps(data, ensure_ascii=False),
+                   extra={'data': data})
+        return response
@@ -33,6 +33,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -115,6 +116,47 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6, }
 
+REDIS_URL = os.getenv('REDIS_URL')
+CACHE_DIR = os.getenv('CACHE_DIR')
+
+if REDIS_URL:
+    CACHE_BACKEND = {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': REDIS_URL,
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'IGNORE_EXCEPTIONS': True,
+        },
+    }
+elif CACHE_DIR:
+    CACHE_BACKEND = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR,
+    }
+else:
+    CACHE_BACKEND = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+
+CACHES = {
+    'default': {
+        **CACHE_BACKEND,
+        'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'foodgram'),
+        'VERSION': int(os.getenv('CACHE_VERSION', 1)),
+        'TIMEOUT': int(os.getenv('CACHE_TIMEOUT', 300)),
+    }
+}
+DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
+
+FRAGMENT_CACHE_TIMEOUT = int(os.getenv('FRAGMENT_CACHE_TIMEOUT', 60 * 60))
+
+PAGE_COUNT_CACHE_TIMEOUT = int(os.getenv('PAGE_COUNT_CACHE_TIMEOUT', 0))
+
+PERFORMANCE_SLOW_REQUEST_MS = int(
+    os.getenv('PERFORMANCE_SLOW_REQUEST_MS', 500))
+PERFORMANCE_SERVER_TIMING = os.getenv(
+    'PERFORMANCE_SERVER_TIMING', 'true').lower() == 'true'
+
 SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.SlidingToken',),
 
@@ -124,25 +166,52 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=3),
 }
 
+LOG_FILE = os.getenv('LOG_FILE', os.path.join(BASE_DIR, 'general.log'))
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'WARNING')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+SQL_LOG_SLOW_MS = float(os.getenv('SQL_LOG_SLOW_MS', 200))
+SQL_LOG_SAMPLE_RATE = float(os.getenv('SQL_LOG_SAMPLE_RATE', 0))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'json': {
+            '()': 'foodgram.log.JsonFormatter',
+        },
+    },
+    'filters': {
+        'sql_sampling': {
+            '()': 'foodgram.log.SqlSamplingFilter',
+            'slow_ms': SQL_LOG_SLOW_MS,
+            'sample_rate': SQL_LOG_SAMPLE_RATE,
+        },
+    },
     'handlers': {
-        'console': {
-            'class': 'logging.FileHandler',
-            'filename': 'general.log',
-            'level': 'DEBUG',
+        'file': {
+            'class': 'foodgram.log.QueueRotatingFileHandler',
+            'filename': LOG_FILE,
+            'max_bytes': LOG_MAX_BYTES,
+            'backup_count': LOG_BACKUP_COUNT,
+            'formatter': 'json',
         },
     },
     'root': {
-        'handlers': ['console'],
-        'level': 'WARNING',
+        'handlers': ['file'],
+        'level': LOG_LEVEL,
     },
     'loggers': {
         'django.db.backends': {
             'level': 'DEBUG',
-            'handlers': ['console'],
-            'propagate': True,
-        }
+            'handlers': ['file'],
+            'filters': ['sql_sampling'],
+            'propagate': False,
+        },
+        # Фильтр выборки SQL не действует на дочерние логгеры,
+        # поэтому DDL миграций (DEBUG) отсекается уровнем.
+        'django.db.backends.schema': {
+            'level': 'INFO',
+        },
     },
 }
@@ -1,3 +1,4 @@
+from api.utils import recipe_relations_changed
 from django.contrib import admin
 
 from .models import (FavoriteRecipe, Ingredient, Recipe, RecipeIngredient,
@@ -24,26 +25,42 @@ class RecipeTagInline(admin.TabularInline):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author')
+    list_display = ('name', 'author', 'favorites_count')
     list_filter = ('name', 'author', 'tags')
     list_select_related = True
     search_fields = ('name',)
+    readonly_fields = ('favorites_count',)
     inlines = (
         RecipeIngredientInline,
         RecipeTagInline,
     )
 
-    def change_view(self, request, object_id, form_url='', extra_content=None):
-        in_favorites_count = FavoriteRecipe.objects.filter(
-            recipe=object_id
-        ).count()
-        context = {'in_favorites_count': in_favorites_count}
-        return super(RecipeAdmin, self).change_view(
-            request, object_id, form_url, context
-        )
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        recipe_relations_changed([form.instance.id])
+
+
+@admin.register(RecipeTag, RecipeIngredient)
+class RecipeRelationAdmin(admin.ModelAdmin):
+    """Связи рецептов: данные рецепта пересчитываются один раз."""
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        recipe_ids = [obj.recipe_id]
+        if change and 'recipe' in form.changed_data:
+            recipe_ids.append(form.initial['recipe'])
+        recipe_relations_changed(recipe_ids)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        recipe_relations_changed([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = list(
+            queryset.values_list('recipe_id', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        recipe_relations_changed(recipe_ids)
 
 
 admin.site.register(Tag)
-admin.site.register(RecipeTag)
-admin.site.register(RecipeIngredient)
 admin.site.register(FavoriteRecipe)
@@ -0,0 +1,77 @@
+import hashlib
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+MAX_IMAGE_SIZE = (1920, 1920)
+RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'detail': (960, 960),
+}
+FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+QUALITY = 82
+RENDITIONS_DIR = 'recipes/renditions'
+
+
+def get_rendition_names(image_hash):
+    """Имена файлов всех вариантов изображения по его хэшу."""
+    return {
+        rendition: {
+            extension: (f'{RENDITIONS_DIR}/{image_hash[:2]}/'
+                        f'{image_hash}_{rendition}.{extension}')
+            for extension in FORMATS
+        }
+        for rendition in RENDITIONS
+    }
+
+
+def encode(image, image_format):
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+def flatten(image):
+    """Переводит изображение в RGB, подкладывая белый фон под прозрачность."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def process_recipe_image(image_file):
+    """
+    Декодирует загруженное изображение один раз, сохраняет варианты
+    для карточки, страницы рецепта и миниатюры в WebP и JPEG.
+    Возвращает хэш содержимого и, если оригинал превышал
+    MAX_IMAGE_SIZE, уменьшенную копию для замены оригинала.
+    """
+    image_file.seek(0)
+    content = image_file.read()
+    image_hash = hashlib.sha256(content).hexdigest()[:32]
+    with Image.open(BytesIO(content)) as source:
+        image = flatten(source)
+    original = None
+    if image.width > MAX_IMAGE_SIZE[0] or image.height > MAX_IMAGE_SIZE[1]:
+        image.thumbnail(MAX_IMAGE_SIZE, Image.LANCZOS)
+        original = ContentFile(encode(image, 'JPEG'),
+                               name=f'{image_hash}.jpg')
+    names = get_rendition_names(image_hash)
+    for rendition, size in RENDITIONS.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        for extension, image_format in FORMATS.items():
+            name = names[rendition][extension]
+            if not default_storage.exists(name):
+                default_storage.save(
+                    name, ContentFile(encode(resized, image_format)))
+    return image_hash, original
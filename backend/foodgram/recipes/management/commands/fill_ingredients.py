@@ -1,26 +1,112 @@
+import csv
 import json
 import os
+import time
 
+from api.cache import bump_version
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from recipes.models import Ingredient
 
 DATA_ROOT = os.path.join(settings.BASE_DIR, 'data')
+CHUNK_SIZE = 64 * 1024
+
+
+def read_json(data_file):
+    """Построчно разбирает JSON-массив, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = data_file.read(CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив ингредиентов')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except ValueError:
+            chunk = data_file.read(CHUNK_SIZE)
+            if not chunk:
+                raise CommandError('Некорректный JSON-файл')
+            buffer += chunk
+            continue
+        yield item['name'], item['measurement_unit']
+        buffer = buffer[end:]
+
+
+def read_csv(data_file):
+    for row in csv.reader(data_file):
+        if row:
+            yield row[0], row[1]
+
+
+READERS = {
+    '.json': read_json,
+    '.csv': read_csv,
+}
 
 
 class Command(BaseCommand):
     help = 'Загрузка ингредиентов.'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(DATA_ROOT, 'ingredients.json'),
+            help='Путь к файлу ингредиентов (.json или .csv)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество ингредиентов в одном INSERT',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Прочитать файл без записи в БД',
+        )
+
     def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        reader = READERS.get(os.path.splitext(path)[1].lower())
+        if reader is None:
+            raise CommandError('Поддерживаются только файлы .json и .csv')
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        started = time.monotonic()
         self.stdout.write(self.style.WARNING('Началось заполнение БД'))
-        with open(
-            os.path.join(DATA_ROOT, 'ingredients.json'), 'r', encoding='utf-8'
-        ) as data_file_ingredients:
-            ingredient_data = json.loads(data_file_ingredients.read())
-            for ingredients in ingredient_data:
-                Ingredient.objects.get_or_create(
-                    name=ingredients['name'],
-                    measurement_unit=ingredients['measurement_unit']
-                )
-
-        self.stdout.write(self.style.SUCCESS('Данные загружены'))
+        count_before = Ingredient.objects.count()
+        seen = set()
+        batch = []
+        with open(path, 'r', encoding='utf-8') as data_file:
+            with transaction.atomic():
+                for name, measurement_unit in reader(data_file):
+                    key = (name.strip(), measurement_unit.strip())
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    batch.append(Ingredient(name=key[0],
+                                            measurement_unit=key[1]))
+                    if len(batch) >= batch_size:
+                        self.save_batch(batch, len(seen), options['dry_run'])
+                        batch = []
+                self.save_batch(batch, len(seen), options['dry_run'])
+        elapsed = time.monotonic() - started
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Прочитано {len(seen)} ингредиентов за {elapsed:.2f} с, '
+                f'БД не изменена'))
+            return
+        bump_version('ingredients')
+        created = Ingredient.objects.count() - count_before
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные загружены: прочитано {len(seen)}, добавлено {created} '
+            f'за {elapsed:.2f} с'))
+
+    def save_batch(self, batch, processed, dry_run):
+        if not batch:
+            return
+        if not dry_run:
+            Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+        self.stdout.write(f'Обработано {processed} ингредиентов')
@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from recipes.models import FavoriteRecipe, Recipe
+from users.models import Follow
+
+User = get_user_model()
+
+
+def count_of(model, field):
+    """Подзапрос с количеством связанных строк model по полю field."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт счётчиков избранного, рецептов и подписчиков.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать расхождения',
+        )
+
+    def handle(self, *args, **options):
+        counters = (
+            (Recipe, 'favorites_count', count_of(FavoriteRecipe, 'recipe')),
+            (User, 'recipes_count', count_of(Recipe, 'author')),
+            (User, 'followers_count', count_of(Follow, 'author')),
+        )
+        with transaction.atomic():
+            for model, field, actual in counters:
+                drifted = model.objects.annotate(actual=actual).exclude(
+                    **{field: F('actual')})
+                count = drifted.count()
+                if count and not options['dry_run']:
+                    model.objects.filter(
+                        pk__in=drifted.values('pk')
+                    ).update(**{field: actual})
+                self.stdout.write(
+                    f'{model._meta.verbose_name_plural}.{field}: '
+                    f'расхождений {count}')
+        self.stdout.write(self.style.SUCCESS('Счётчики проверены'))
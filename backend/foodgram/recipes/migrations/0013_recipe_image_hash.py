@@ -0,0 +1,18 @@
+# Generated by Django 2.2.19 on 2026-10-18 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_size'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_hash',
+            field=models.CharField(blank=True, editable=False, help_text='Хэш содержимого изображения', max_length=32),
+        ),
+    ]
@@ -1,7 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 
+from .images import get_rendition_names, process_recipe_image
+
 User = get_user_model()
 
 MIN_VALUE = 1
@@ -66,6 +69,10 @@ class Recipe(models.Model):
         blank=False,
         help_text='Время приготовления в минутах')
     image = models.ImageField(upload_to="recipes/", blank=False)
+    image_hash = models.CharField(max_length=32,
+                                  blank=True,
+                                  editable=False,
+                                  help_text='Хэш содержимого изображения')
     author = models.ForeignKey(User,
                                on_delete=models.CASCADE,
                                help_text='Автор рецепта',
@@ -73,15 +80,44 @@ class Recipe(models.Model):
     tags = models.ManyToManyField(Tag, through='RecipeTag')
     ingredients = models.ManyToManyField(
         Ingredient, through='RecipeIngredient')
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text='Сколько раз рецепт добавили в избранное')
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        help_text='Поисковый вектор по названию, ингредиентам и описанию')
 
     class Meta:
         ordering = ('-id',)
+        indexes = [
+            models.Index(fields=['author', '-id'],
+                         name='recipe_author_id_idx'),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
     def __str__(self):
         return self.name[:15]
 
+    def save(self, *args, **kwargs):
+        if self.image and not self.image._committed:
+            self.image_hash, original = process_recipe_image(self.image)
+            if original is not None:
+                self.image = original
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = [*update_fields, 'image_hash']
+        super().save(*args, **kwargs)
+
+    @property
+    def image_renditions(self):
+        """Имена файлов вариантов изображения или None."""
+        if not self.image_hash:
+            return None
+        return get_rendition_names(self.image_hash)
+
 
 class RecipeTag(models.Model):
     """Модель сзязи между рецептом и тэгом."""
@@ -97,6 +133,10 @@ class RecipeTag(models.Model):
         verbose_name_plural = 'Связи рецепт-тэг'
         constraints = [models.UniqueConstraint(fields=['tag', 'recipe'],
                        name='unique_tag_recipe')]
+        indexes = [
+            models.Index(fields=['recipe', 'tag'],
+                         name='recipetag_recipe_tag_idx'),
+        ]
 
     def __str__(self):
         return f'Тэг {self.tag.name[:15]} в рецепте {self.recipe.name[:15]}'
@@ -123,6 +163,10 @@ class RecipeIngredient(models.Model):
         verbose_name_plural = 'Связи рецепт-ингредиент'
         constraints = [models.UniqueConstraint(fields=['ingredient', 'recipe'],
                        name='unique_ingredient_recipe')]
+        indexes = [
+            models.Index(fields=['recipe', 'ingredient'],
+                         name='recipeingr_recipe_ingr_idx'),
+        ]
 
     def __str__(self):
         return (f'Рецепт {self.recipe.name[:15]} влючает {self.amount}',
@@ -149,6 +193,10 @@ class FavoriteRecipe(models.Model):
                 name='unique_favorite_users_recipe',
             ),
         ]
+        indexes = [
+            models.Index(fields=['user', '-id'],
+                         name='favorite_user_id_idx'),
+        ]
 
     def __str__(self):
         return (f'Пользователь {self.user.username[:15]}',
@@ -25,6 +25,10 @@ class ShoppingCart(models.Model):
                 name='shopping_cart_user_recipe_unique',
             ),
         ]
+        indexes = [
+            models.Index(fields=['user', '-id'],
+                         name='shopping_cart_user_id_idx'),
+        ]
 
     def __str__(self):
         return (f'Пользователь {self.user} добавил',
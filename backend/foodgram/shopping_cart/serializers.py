@@ -1,3 +1,4 @@
+from api.serializers import RecipeSubcribeSerializer
 from rest_framework import exceptions, serializers
 from shopping_cart.models import ShoppingCart
 
@@ -19,9 +20,5 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         return data
 
     def to_representation(self, instance):
-        return {
-            'id': instance.recipe.id,
-            'name': instance.recipe.name,
-            'image': str(instance.recipe.image),
-            'cooking_time': instance.recipe.cooking_time,
-        }
+        return RecipeSubcribeSerializer(instance.recipe,
+                                        context=self.context).data
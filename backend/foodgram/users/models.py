@@ -20,6 +20,12 @@ class User(AbstractUser):
     last_name = models.CharField('Фамилия пользователя',
                                  max_length=150,
                                  blank=False)
+    recipes_count = models.PositiveIntegerField('Количество рецептов',
+                                                default=0,
+                                                editable=False)
+    followers_count = models.PositiveIntegerField('Количество подписчиков',
+                                                  default=0,
+                                                  editable=False)
 
     class Meta:
         ordering = ('-id',)